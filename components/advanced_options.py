@@ -1,3 +1,4 @@
+import pandas as pd
 import streamlit as st
 
 class AdvancedOptions:
@@ -8,7 +9,7 @@ class AdvancedOptions:
     def initialize_session_state(self):
         # Initialize filter values with a different key prefix
         if 'filter_values' not in st.session_state:
-            cost_columns = [col for col in st.session_state["ads_original_data"].columns if 'cost_per_' in col]
+            cost_columns = self.get_filter_options()['cost_columns']
             filter_values = {
                 'cost_column': cost_columns[0] if cost_columns else None,
                 'min_impressions': 1,
@@ -21,6 +22,19 @@ class AdvancedOptions:
         if 'apply_filters' not in st.session_state:
             st.session_state.apply_filters = False
 
+    def get_filter_options(self):
+        # Colunas de custo e listas de campanhas/conjuntos/anúncios guardadas por conjunto de packs
+        # (descartadas em add_ads_pack/remove_ads_pack)
+        if 'filter_options' not in st.session_state:
+            ads_original_data = st.session_state["ads_original_data"]
+            st.session_state.filter_options = {
+                'cost_columns': [col for col in ads_original_data.columns if 'cost_per_' in col],
+                'campaign_list': list(ads_original_data['campaign_name'].unique()),
+                'adset_list': list(ads_original_data['adset_name'].unique()),
+                'ad_list': list(ads_original_data['ad_name'].unique()),
+            }
+        return st.session_state.filter_options
+
     def build(self):
         # ADVANCED OPTIONS UI
         with st.expander('Avanced options', expanded=False):
@@ -36,7 +50,8 @@ class AdvancedOptions:
                         filters = st.empty()
 
                     # EVENT COST COLUMNS
-                    cost_columns = [col for col in st.session_state["ads_original_data"].columns if 'cost_per_' in col]
+                    filter_options = self.get_filter_options()
+                    cost_columns = filter_options['cost_columns']
 
                     # EVENT COST SELECTOR
                     with select_conversion.container():
@@ -52,9 +67,9 @@ class AdvancedOptions:
 
                     # FILTERS
                     with filters.container():
-                        campaign_list = list(st.session_state['ads_original_data']['campaign_name'].unique())
-                        adset_list = list(st.session_state['ads_original_data']['adset_name'].unique())
-                        ad_list = list(st.session_state['ads_original_data']['ad_name'].unique())
+                        campaign_list = filter_options['campaign_list']
+                        adset_list = filter_options['adset_list']
+                        ad_list = filter_options['ad_list']
                         # FILTERS > CAMPAIGN
                         cols = st.columns([1,6], gap='small')
                         with cols[0]:
@@ -130,18 +145,21 @@ class AdvancedOptions:
 
             # Apply filters here
             if filters:
+                # Condições combinadas numa única máscara
+                mask = pd.Series(True, index=df_ads_data.index)
                 if filters['filters_campaign'] and filters['filters_campaign'] != []:
-                    df_ads_data = df_ads_data[df_ads_data['campaign_name'].isin(filters['filters_campaign'])]
+                    mask &= df_ads_data['campaign_name'].isin(filters['filters_campaign'])
                 if filters['filters_adset'] and filters['filters_adset'] != []:
-                    df_ads_data = df_ads_data[df_ads_data['adset_name'].isin(filters['filters_adset'])]
+                    mask &= df_ads_data['adset_name'].isin(filters['filters_adset'])
                 if filters['filters_adname'] and filters['filters_adname'] != []:
-                    df_ads_data = df_ads_data[df_ads_data['ad_name'].isin(filters['filters_adname'])]
+                    mask &= df_ads_data['ad_name'].isin(filters['filters_adname'])
                 # if filters['min_plays']:
-                #     df_ads_data = df_ads_data[df_ads_data['total_plays'] >= filters['min_plays']]
+                #     mask &= df_ads_data['total_plays'] >= filters['min_plays']
                 if filters['min_impressions']:
-                    df_ads_data = df_ads_data[df_ads_data['impressions'] >= filters['min_impressions']]
+                    mask &= df_ads_data['impressions'] >= filters['min_impressions']
                 if filters['min_spend']:
-                    df_ads_data = df_ads_data[df_ads_data['spend'] >= filters['min_spend']]
+                    mask &= df_ads_data['spend'] >= filters['min_spend']
+                df_ads_data = df_ads_data[mask]
                 if filters['cost_column']:
                     cost_column = filters['cost_column']
                     event_name = cost_column.split('.')[-1]
@@ -1,7 +1,73 @@
+import pandas as pd
+import altair as alt
 import streamlit as st
+from styles.styler import COLORS
 
 def bt_delete(key, action):
     with st.container():
         #st.markdown("<a>❌</a>", unsafe_allow_html=True)
         bt_delete = st.button("❌", key=f"delete_{key}", on_click=action, args=(key,))
-        return bt_delete
\ No newline at end of file
+        return bt_delete
+
+def build_retention_chart(video_play_curve_actions):
+    play_curve_metrics = pd.DataFrame(video_play_curve_actions).reset_index()
+    play_curve_metrics.columns = ['index', 'value']
+    play_curve_chart = alt.Chart(play_curve_metrics).mark_area( # type: ignore
+        interpolate='basis', # type: ignore
+        line=True, # type: ignore
+        point=True, # type: ignore
+        color=alt.Gradient( # type: ignore
+            gradient='linear', 
+            stops=[alt.GradientStop(color='#172654', offset=0), # type: ignore
+                alt.GradientStop(color='#61a7f9', offset=1)], # type: ignore
+            x1=1,
+            x2=1,
+            y1=1,
+            y2=0
+        )
+    ).encode(
+        x=alt.X('index', title='Retention per second (%)'), # type: ignore
+        y=alt.Y('value', title=None), # type: ignore
+    ).configure(
+        background = COLORS['BLACK_500']
+    )
+    return st.altair_chart(play_curve_chart, use_container_width=True, theme=None)
+
+def pack_card(item_index, unique_id, on_delete=None):
+    """ Card de um pack carregado (ADs Loader e sidebar); com on_delete, mostra o botão de remover """
+    pack_info = st.session_state[f"{unique_id}_pack_info"]
+
+    cols_header = st.columns([4, 1])
+    with cols_header[0]:
+        st.markdown(f'#### Pack {item_index + 1}')
+    if on_delete is not None:
+        with cols_header[1]:
+            bt_delete(unique_id, on_delete)
+
+    # COUNTS
+    st.dataframe(
+        pd.DataFrame([{
+        "Campaigns": pack_info.campaigns, 
+        "Adsets": pack_info.adsets, 
+        "ADs": pack_info.ads
+    }]), hide_index=True, use_container_width=True )
+
+    st.caption(F"{pack_info.account} ({pack_info.act_id})")
+
+    # TIME RANGE
+    cols_time_range = st.columns([1,3])
+    with cols_time_range[0]:
+        st.caption("Date:")
+    with cols_time_range[1]:
+        st.markdown(" *:gray[→]* ".join(pack_info.period))
+
+    # FILTERS
+    item_filters = pack_info.filters
+    cols_filters = st.columns([1,3])
+    with cols_filters[0]:
+        st.caption("Filters:")
+    with cols_filters[1]:
+        if item_filters != []:
+            st.markdown("\n".join(f'{filter["field"].split(".")[0].capitalize()} *:gray[{filter["operator"].lower()}]* **{filter["value"]}**' for filter in item_filters))
+        else:
+            st.caption("None")
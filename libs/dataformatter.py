@@ -1,22 +1,79 @@
+from dataclasses import dataclass
+from datetime import date
 from enum import unique
+from functools import lru_cache
 import streamlit as st
 import pandas as pd
 import numpy as np
 
 from libs.session_manager import get_session_ads_data
 
-def add_ads_pack(unique_id, pack):
+# COLUNAS DA CURVA DE RETENÇÃO (mesma ordem de 'video_play_curve_actions')
+RETENTION_COLUMNS = [f'retention_at_{i}' for i in range(15)] + \
+            ['retention_at_15to20', 'retention_at_20to25', 'retention_at_25to30',
+                'retention_at_30to40', 'retention_at_40to50', 'retention_at_50to60',
+                'retention_over_60']
+
+# COLUNAS ESCALARES DO INSIGHTS
+STRING_COLUMNS = ['ad_name', 'adset_name', 'campaign_name', 'ad_id', 'adset_id', 'campaign_id']
+NUMERIC_COLUMNS = ['clicks', 'impressions', 'inline_link_clicks', 'reach', 'spend']
+
+# COLUNAS DE "OBJECT LISTS" QUE SÓ USAM O PRIMEIRO VALOR: origem -> (coluna final, default)
+FIRST_VALUE_COLUMNS = {
+    'video_play_actions': ('total_plays', 0),
+    'video_p50_watched_actions': ('video_watched_p50', 0),
+    'video_thruplay_watched_actions': ('total_thruplays', 0),
+    'website_ctr': ('website_ctr', 0.0),
+}
+
+# REGRAS DE AGREGAÇÃO POR COLUNA
+AGG_TYPE_FIRST = {'ad_name', 'account_id', 'creative.actor_id', 'creative.thumbnail_url', 'creative.video_id', 'creative.body', 'creative.call_to_action_type', 'creative.instagram_permalink_url', 'creative.object_type', 'creative.status', 'creative.title'}
+AGG_TYPE_SUM = {'clicks', 'impressions', 'inline_link_clicks', 'reach', 'total_plays', 'total_thruplays'}
+AGG_TYPE_UNIQUE_LIST = {'ad_id', 'adset_id', 'adset_name', 'campaign_id', 'campaign_name'}
+AGG_TYPE_AGG_UNIQUE_LIST = {'adcreatives_videos_ids', 'adcreatives_videos_thumbs'}
+
+# MÉTRICAS DE RAZÃO (recalculadas sobre as somas já agregadas de cada grupo)
+RATIO_METRICS = {
+    'ctr': lambda g: g['clicks'] / g['impressions'] * 100,
+    'cpm': lambda g: g['spend'] * 1000 / g['impressions'],
+    'frequency': lambda g: g['impressions'] / g['reach'],
+    'website_ctr': lambda g: g['inline_link_clicks'] / g['impressions'] * 100,
+    'profile_ctr': lambda g: (g['clicks'] - g['inline_link_clicks']) / g['impressions'] * 100,
+    'connect_rate': lambda g: g['actions.landing_page_view'] / g['inline_link_clicks'] * 100, # PROBLEMÁTICA
+}
+
+@dataclass(slots=True)
+class AdsPack:
+    """ Metadados de um pack carregado (exibidos no loader e na sidebar)"""
+    account: str
+    act_id: str
+    time_range: dict
+    filters: list
+    campaigns: int = 0
+    adsets: int = 0
+    ads: int = 0
+    period: tuple = ()
+
+def add_ads_pack(unique_id, pack, pack_info):
     ## FORMATA NO PADRÃO UNIVERSAL
     ads_data = format_ads_data(pack)
     ## MARCA O PACK COM O UNIQUE_ID
     ads_data["from_pack"] = unique_id
+    ## CONTAGENS E PERÍODO DO PACK
+    pack_info.campaigns = ads_data["campaign_name"].nunique()
+    pack_info.adsets = ads_data["adset_name"].nunique()
+    pack_info.ads = len(ads_data)
+    pack_info.period = tuple(date.fromisoformat(pack_info.time_range[key][:10]).strftime("%d/%m/%Y") for key in ("since", "until"))
+    st.session_state[f"{unique_id}_pack_info"] = pack_info
 
     ## REGISTRA PACK INDIVIDUAL
     if "loaded_ads" not in st.session_state:
         st.session_state["loaded_ads"] = []
     st.session_state["loaded_ads"].append(unique_id)
-    ## SALVA DATAFRAME DO PACK
-    st.session_state[f"{unique_id}_ads_data"] = ads_data.copy()
+    ## AS LINHAS DO PACK FICAM SÓ NO DATAFRAME UNIFICADO (separáveis por 'from_pack')
+
+    ## DESCARTA AS OPÇÕES DE FILTRO DOS PACKS ANTERIORES
+    st.session_state.pop("filter_options", None)
 
     df_ads_data = get_session_ads_data()
     if df_ads_data is not None:
@@ -27,92 +84,98 @@ def add_ads_pack(unique_id, pack):
         st.session_state["ads_data"] = ads_data
         st.session_state["ads_original_data"] = ads_data
 
-def remove_ads_pack(item_index):
-    ## PROCURA PACK INDIVIDUAL
-    if "loaded_ads" in st.session_state:
-        unique_id = st.session_state["loaded_ads"][item_index]
-        st.session_state['loaded_ads'].remove(unique_id)
+def remove_ads_pack(unique_id):
+    ## PROCURA PACK INDIVIDUAL (pelo unique_id)
+    if unique_id in st.session_state.get("loaded_ads", []):
+        st.session_state["loaded_ads"].remove(unique_id)
+        ## REMOVE METADADOS, AGREGAÇÕES SALVAS E LINHAS DO PACK
+        st.session_state.pop(f"{unique_id}_pack_info", None)
+        st.session_state.pop("aggregated_data", None)
+        st.session_state.pop("filter_options", None)
         ads_original_data = st.session_state["ads_original_data"]
-        ads_data = ads_original_data[ads_original_data["from_pack"] != unique_id]
-        ads_data = ads_data.reset_index(drop=True)
-        st.session_state["ads_data"] = ads_data.copy()
-        st.session_state["ads_original_data"] = ads_data.copy()
+        ads_data = ads_original_data[ads_original_data["from_pack"] != unique_id].reset_index(drop=True)
+        st.session_state["ads_data"] = ads_data
+        st.session_state["ads_original_data"] = ads_data
+
+# Função para extrair o primeiro 'value' de colunas de "object lists"
+def first_action_value(series, default):
+    """ Retorna o 'value' do primeiro item de cada lista (ou o default, se não houver) """
+    return pd.Series([
+        x[0].get('value', default) if isinstance(x, list) and x and isinstance(x[0], dict) else default
+        for x in series.to_numpy()
+    ], index=series.index, dtype=object)
 
 # Função para transformar "object lists" em colunas
-def expand_conversions(row, columns):
-    for column in columns:
-        if isinstance(row[column], list):
-            for conversion in row[column]:
-                column_name = (f"""{column}.{conversion["action_type"]}""")
-                row[column_name] = pd.to_numeric(conversion["value"], errors="coerce")
-        elif isinstance(row[column], dict):
-            for key, value in row[column].items():
-                column_name = f"{column}.{key}"
-                row[column_name] = pd.to_numeric(value, errors="coerce") if isinstance(value, (int, float)) else value
-    return row
+def expand_conversions(df, columns):
+    """ Explode as listas de {action_type, value} em formato longo e pivota em colunas '<coluna>.<action_type>' """
+    # Coluna e action_type guardados separados; o nome '<coluna>.<action_type>' é montado por par
+    records = [
+        (index, column, conversion['action_type'], conversion["value"])
+        for column in columns if column in df.columns
+        for index, conversions in df[column].items() if isinstance(conversions, list)
+        for conversion in conversions
+    ]
+    if not records:
+        return pd.DataFrame(index=df.index)
+    df_long = pd.DataFrame(records, columns=["index", "column", "action_type", "value"])
+    df_long["value"] = pd.to_numeric(df_long["value"], errors="coerce")
+    df_wide = df_long.groupby(["index", "column", "action_type"])["value"].sum(min_count=1).unstack(["column", "action_type"]).sort_index(axis=1)
+    df_wide.columns = [f"{column}.{action_type}" for column, action_type in df_wide.columns]
+    return df_wide.reindex(df.index)
+
+# Função para transformar "objects" em colunas
+def expand_objects(df, columns):
+    """ Transforma colunas de dicts em colunas '<coluna>.<chave>' """
+    expanded = [
+        pd.DataFrame([value if isinstance(value, dict) else {} for value in df[column]], index=df.index).add_prefix(f"{column}.")
+        for column in columns if column in df.columns
+    ]
+    return pd.concat(expanded, axis=1) if expanded else pd.DataFrame(index=df.index)
 
 def format_ads_data(json_data):
     df = pd.DataFrame(json_data)
     # STRINGS
-    df["ad_name"] = df["ad_name"].astype(str)
-    df["adset_name"] = df["adset_name"].astype(str)
-    df["campaign_name"] = df["campaign_name"].astype(str)
-    df["ad_id"] = df["ad_id"].astype(str)
-    df["adset_id"] = df["adset_id"].astype(str)
-    df["campaign_id"] = df["campaign_id"].astype(str)
+    df[STRING_COLUMNS] = df[STRING_COLUMNS].astype(str)
     
-    # INTEGERS
-    df["clicks"] = pd.to_numeric(df["clicks"], errors="coerce", downcast="integer").fillna(0)
-    df["impressions"] = pd.to_numeric(df["impressions"], errors="coerce", downcast="integer").fillna(0)
-    df["inline_link_clicks"] = pd.to_numeric(df["inline_link_clicks"], errors="coerce", downcast="integer").fillna(0)
-    df["reach"] = pd.to_numeric(df["reach"], errors="coerce", downcast="integer").fillna(0)
-
-    # FLOATS
-    df["cpm"] = pd.to_numeric(df["cpm"], errors="coerce", downcast="float").fillna(0)
-    df["ctr"] = pd.to_numeric(df["ctr"], errors="coerce", downcast="float").fillna(0)
-    df["frequency"] = pd.to_numeric(df["frequency"], errors="coerce", downcast="float").fillna(0)
-    df["spend"] = pd.to_numeric(df["spend"], errors="coerce", downcast="float").fillna(0)
+    # INTEGERS E FLOATS
+    df[NUMERIC_COLUMNS] = df[NUMERIC_COLUMNS].apply(pd.to_numeric, errors="coerce").fillna(0)
+
+    # RAZÕES (mesmas fórmulas da agregação, ver RATIO_METRICS)
+    for col in ('ctr', 'cpm', 'frequency'):
+        df[col] = RATIO_METRICS[col](df).replace([np.inf, -np.inf], np.nan).fillna(0)
 
     # PLAY CURVE ACTIONS
-    play_curve_actions = df['video_play_curve_actions'].apply(lambda x: x[0]['value'] if isinstance(x, list) and len(x) > 0 and isinstance(x[0], dict) and 'value' in x[0] else [0] * 22)
-    play_curve_actions_column_names = [f'retention_at_{i}' for i in range(15)] + \
-                ['retention_at_15to20', 'retention_at_20to25', 'retention_at_25to30', 
-                    'retention_at_30to40', 'retention_at_40to50', 'retention_at_50to60', 
-                    'retention_over_60']
-    df_play_curve_actions = pd.DataFrame(play_curve_actions.tolist(), columns=play_curve_actions_column_names)
-    df_play_curve_actions = df_play_curve_actions.apply(lambda x: pd.to_numeric(x, downcast='integer', errors='coerce'))
-    df['video_play_curve_actions'] = df_play_curve_actions.values.tolist()
-
-    # PLAY ACTIONS
-    df_play_actions = pd.DataFrame(df['video_play_actions'].apply(lambda x: x[0]['value'] if isinstance(x, list) and len(x) > 0 and isinstance(x[0], dict) and 'value' in x[0] else 0))
-    df_play_actions.rename(columns={'video_play_actions': 'total_plays'}, inplace=True)
-    df_play_actions['total_plays'] = pd.to_numeric(df_play_actions['total_plays'], errors='coerce', downcast='integer').fillna(0)
-
-    # 50% PLAY ACTIONS
-    df_p50_watched = pd.DataFrame(df['video_p50_watched_actions'].apply(lambda x: x[0]['value'] if isinstance(x, list) and len(x) > 0 and isinstance(x[0], dict) and 'value' in x[0] else 0))
-    df_p50_watched.rename(columns={'video_p50_watched_actions': 'video_watched_p50'}, inplace=True)
-    df_p50_watched['video_watched_p50'] = pd.to_numeric(df_p50_watched['video_watched_p50'], errors='coerce', downcast='integer').fillna(0)
-    
-    # THRUPLAY ACTIONS
-    df_thruplay_actions = pd.DataFrame(df['video_thruplay_watched_actions'].apply(lambda x: x[0]['value'] if isinstance(x, list) and len(x) > 0 and isinstance(x[0], dict) and 'value' in x[0] else 0))
-    df_thruplay_actions.rename(columns={'video_thruplay_watched_actions': 'total_thruplays'}, inplace=True)
-    df_thruplay_actions['total_thruplays'] = pd.to_numeric(df_thruplay_actions['total_thruplays'], errors='coerce', downcast='integer').fillna(0)
+    play_curve_actions = first_action_value(df['video_play_curve_actions'], [0] * len(RETENTION_COLUMNS))
+    # Matriz anúncios x pontos da curva
+    # Pontos convertidos juntos e espalhados na matriz pela máscara de comprimentos
+    n_points = len(RETENTION_COLUMNS)
+    curves_points = [curve[:n_points] for curve in play_curve_actions]
+    lengths = np.fromiter((len(curve) for curve in curves_points), dtype=int, count=len(curves_points))
+    values = pd.to_numeric(pd.Series([value for curve in curves_points for value in curve], dtype=object), errors='coerce')
+    curves = np.full((len(df), n_points), np.nan)
+    curves[np.arange(n_points) < lengths[:, None]] = values.to_numpy(dtype=float)
+    df_play_curve_actions = pd.DataFrame(curves, columns=RETENTION_COLUMNS, index=df.index)
+    df['video_play_curve_actions'] = curves.tolist()
 
-    # WEBSITE CTR
-    df_website_ctr = pd.DataFrame(df['website_ctr'].apply(lambda x: x[0]['value'] if isinstance(x, list) and len(x) > 0 and isinstance(x[0], dict) and 'value' in x[0] else 0.0))
-    df_website_ctr['website_ctr'] = pd.to_numeric(df_website_ctr['website_ctr'], errors='coerce', downcast='float').fillna(0)
+    # PLAY ACTIONS, 50% PLAY ACTIONS, THRUPLAY ACTIONS E WEBSITE CTR
+    df_first_values = pd.DataFrame({
+        column: pd.to_numeric(first_action_value(df[source_column], default), errors='coerce').fillna(0)
+        for source_column, (column, default) in FIRST_VALUE_COLUMNS.items()
+    })
 
     ######################## CONCATENA NOVAS COLUNAS ########################
-    df = df.drop(columns=['video_play_actions', 'video_thruplay_watched_actions', 'website_ctr', 'video_p50_watched_actions'])
-    df = pd.concat([df, df_play_curve_actions, df_play_actions, df_p50_watched, df_thruplay_actions, df_website_ctr], axis=1)
+    df = df.drop(columns=list(FIRST_VALUE_COLUMNS))
+    df = pd.concat([df, df_play_curve_actions, df_first_values], axis=1)
 
     ######################## EXPLODE COLUNAS DE ARRAY ########################
-    df = df.apply(lambda row: expand_conversions(row, ['actions', 'conversions', 'cost_per_conversion', 'creative']), axis=1)
-    df = df.drop(columns=['actions', 'conversions', 'cost_per_conversion', 'creative'])
+    df_conversions = expand_conversions(df, ['actions', 'conversions', 'cost_per_conversion'])
+    df_objects = expand_objects(df, ['creative'])
+    df = df.drop(columns=['actions', 'conversions', 'cost_per_conversion', 'creative'], errors='ignore')
+    df = pd.concat([df, df_conversions, df_objects], axis=1)
 
     ######################## COLUNAS CALCULADAS ########################
     # CONNECT RATE
-    df['connect_rate'] = df.apply(lambda row: row['actions.landing_page_view'] / row['inline_link_clicks'] if row['inline_link_clicks'] != 0 else pd.NA, axis=1)
+    df['connect_rate'] = pd.to_numeric(df['actions.landing_page_view'], errors='coerce') / df['inline_link_clicks'].where(df['inline_link_clicks'] != 0)
     df['connect_rate'] = pd.to_numeric(df['connect_rate'], errors='coerce', downcast='float')
     # PROFILE CTR
     df['profile_ctr'] = df['ctr'] - df['website_ctr']
@@ -131,13 +194,12 @@ def format_ads_data(json_data):
     return df.copy()
 
 def create_agg_rules(df):
-    all_columns = df.columns
-    aggs = {}
+    # Regras guardadas por conjunto de colunas
+    return dict(create_agg_rules_for_columns(tuple(df.columns)))
 
-    type_first = ['ad_name', 'account_id', 'creative.actor_id', 'creative.thumbnail_url', 'creative.video_id', 'creative.body', 'creative.call_to_action_type', 'creative.instagram_permalink_url', 'creative.object_type', 'creative.status', 'creative.title']
-    type_sum = ['clicks', 'impressions', 'inline_link_clicks', 'reach', 'spend', 'total_plays', 'total_thruplays']
-    type_unique_list = ['ad_id', 'adset_id', 'adset_name', 'campaign_id', 'campaign_name']
-    type_agg_unique_list = [ 'adcreatives_videos_ids', 'adcreatives_videos_thumbs' ]
+@lru_cache(maxsize=64)
+def create_agg_rules_for_columns(all_columns):
+    aggs = {}
 
     for col in all_columns:
         if col.startswith('actions.') or col.startswith('conversions.'):
@@ -145,38 +207,41 @@ def create_agg_rules(df):
         elif col.startswith('cost_per_'):
             conv_col = 'conversions.' + col[len('cost_per_conversion.'):]
             if conv_col in all_columns:
-                aggs[col] = lambda x, conv_col=conv_col: (
-                    (df.loc[x.index, 'spend'].sum() / df.loc[x.index, conv_col].sum()) if df.loc[x.index, 'spend'].sum() != 0 and df.loc[x.index, conv_col].sum() != 0 else 0
-                )
+                # Recalculada em aggregate_dataframe (spend / conversões do grupo)
+                aggs[col] = 'first'
             else:
                 print(f"Warning: No corresponding conversions column found for {col}. This column will be excluded from the aggregation.")
         elif col.startswith('retention_') or col == 'video_watched_p50':
-            aggs[col] = lambda x: np.average(x, weights=df.loc[x.index, 'total_plays']) if df.loc[x.index, 'total_plays'].sum() != 0 else 0
+            # Média ponderada por total_plays, recalculada em aggregate_dataframe
+            aggs[col] = 'first'
         elif col == 'video_play_curve_actions':
-            aggs[col] = lambda x: np.average(x.tolist(), axis=0, weights=df.loc[x.index, 'total_plays']) if df.loc[x.index, 'total_plays'].sum() != 0 else 0
-        elif col == 'ctr':
-            aggs[col] = lambda x: df.loc[x.index, 'clicks'].sum() / df.loc[x.index, 'impressions'].sum() * 100
-        elif col == 'cpm':
-            aggs[col] = lambda x: df.loc[x.index, 'spend'].sum() * 1000 / df.loc[x.index, 'impressions'].sum()
-        elif col == 'frequency':
-            aggs[col] = lambda x: df.loc[x.index, 'impressions'].sum() / df.loc[x.index, 'reach'].sum()
-        elif col == 'website_ctr':
-            aggs[col] = lambda x: df.loc[x.index, 'inline_link_clicks'].sum() / df.loc[x.index, 'impressions'].sum() * 100
-        elif col == 'profile_ctr':
-            aggs[col] = lambda x: (df.loc[x.index, 'clicks'].sum() - df.loc[x.index, 'inline_link_clicks'].sum()) / df.loc[x.index, 'impressions'].sum() * 100
-        elif col == 'connect_rate':
-            aggs[col] = lambda x: df.loc[x.index, 'actions.landing_page_view'].sum() / df.loc[x.index, 'inline_link_clicks'].sum() * 100 # PROBLEMÁTICA
-        elif col in type_first:
+            # Remontada a partir das colunas retention_* já agregadas (ver aggregate_dataframe)
+            aggs[col] = 'first'
+        elif col in RATIO_METRICS:
+            # Recalculada em aggregate_dataframe (ver RATIO_METRICS)
+            aggs[col] = 'first'
+        elif col == 'spend':
+            # Somado em centavos (int64) em aggregate_dataframe
             aggs[col] = 'first'
-        elif col in type_sum:
+        elif col in AGG_TYPE_FIRST:
+            aggs[col] = 'first'
+        elif col in AGG_TYPE_SUM:
             aggs[col] = 'sum'
-        elif col in type_unique_list:
-            aggs[col] = lambda x: list(set(x))
-        elif col in type_agg_unique_list:
-            aggs[col] = lambda x: list(set([item for sublist in x for item in sublist]))
+        elif col in AGG_TYPE_UNIQUE_LIST or col in AGG_TYPE_AGG_UNIQUE_LIST:
+            # Listas de valores únicos montadas em aggregate_dataframe (ver unique_lists_by_group)
+            aggs[col] = 'first'
 
     return aggs
 
+def unique_lists_by_group(values, group_codes, n_groups):
+    """ Lista de valores únicos de cada grupo, na ordem em que aparecem\n
+        ✅ Sem uma chamada Python por grupo (drop_duplicates + groupby sobre a coluna inteira)
+    """
+    pairs = pd.DataFrame({'group': group_codes, 'value': values.to_numpy()}, index=values.index)
+    pairs = pairs.explode('value').dropna(subset=['value']).drop_duplicates()
+    lists = pairs.groupby('group')['value'].agg(list)
+    return [lists.get(group, []) for group in range(n_groups)]
+
 def aggregate_dataframe(df, group_by):
     agg_rules = create_agg_rules(df)
 
@@ -184,8 +249,42 @@ def aggregate_dataframe(df, group_by):
     if group_by not in df.columns:
         raise KeyError(f"The column '{group_by}' does not exist in the DataFrame.")
     
-    # Group by the specified column(s)
-    df_grouped = df.groupby(group_by).agg(agg_rules)
+    # Agrupa pelos códigos inteiros da chave
+    group_codes, _ = pd.factorize(df[group_by], sort=True)
+    df_grouped = df.groupby(group_codes).agg(agg_rules)
+
+    # Spend somado em centavos inteiros: a soma não acumula erro de ponto flutuante nem depende da ordem das linhas
+    if 'spend' in df_grouped.columns:
+        spend_cents = (df['spend'] * 100).round().astype('int64')
+        df_grouped['spend'] = spend_cents.groupby(group_codes).sum() / 100
+
+    # IDs/nomes (valores escalares) e listas de vídeos/thumbs (achatadas antes) viram listas de únicos por grupo
+    for col in df_grouped.columns:
+        if col in AGG_TYPE_UNIQUE_LIST:
+            df_grouped[col] = unique_lists_by_group(df[col], group_codes, len(df_grouped))
+        elif col in AGG_TYPE_AGG_UNIQUE_LIST:
+            df_grouped[col] = unique_lists_by_group(df[col].map(lambda x: x if isinstance(x, list) else []), group_codes, len(df_grouped))
+
+    # Médias ponderadas por total_plays: soma dos produtos do grupo / soma dos plays do grupo
+    weighted_columns = [col for col in df_grouped.columns if col.startswith('retention_') or col == 'video_watched_p50']
+    if weighted_columns:
+        weighted_sums = df[weighted_columns].mul(df['total_plays'], axis=0).groupby(group_codes).sum()
+        plays = df_grouped['total_plays']
+        df_grouped[weighted_columns] = weighted_sums.div(plays, axis=0).mask(plays == 0, 0, axis=0)
+
+    # Razões sobre as colunas somadas (RATIO_METRICS)
+    for col, ratio in RATIO_METRICS.items():
+        if col in df_grouped.columns:
+            df_grouped[col] = pd.to_numeric(ratio(df_grouped))
+    for col in df_grouped.columns:
+        if col.startswith('cost_per_'):
+            spend = df_grouped['spend']
+            conversions = df_grouped['conversions.' + col[len('cost_per_conversion.'):]]
+            df_grouped[col] = pd.to_numeric((spend / conversions).where((spend != 0) & (conversions != 0), 0))
+
+    # A curva agregada é a mesma média ponderada das colunas retention_*, então não precisa ser recalculada
+    if 'video_play_curve_actions' in df_grouped.columns and all(col in df_grouped.columns for col in RETENTION_COLUMNS):
+        df_grouped['video_play_curve_actions'] = df_grouped[RETENTION_COLUMNS].values.tolist()
     
     # Reset index without dropping the group_by column
     df_grouped = df_grouped.reset_index(drop=True)
@@ -196,6 +295,24 @@ def aggregate_dataframe(df, group_by):
     
     return df_grouped
 
+def get_session_aggregated_data(df, group_by):
+    """ Agrega o dataframe reaproveitando o resultado salvo no st.session_state\n
+        ✅ Mesmos packs carregados\n
+        ✅ Mesmas linhas filtradas e mesmas colunas
+    """
+    cache_key = (
+        id(st.session_state.get("ads_original_data")),
+        tuple(st.session_state.get("loaded_ads", [])),
+        tuple(df.index),
+        tuple(df.columns),
+    )
+    aggregated_data = st.session_state.setdefault("aggregated_data", {})
+    cached = aggregated_data.get(group_by)
+    if cached is None or cached[0] != cache_key:
+        cached = (cache_key, aggregate_dataframe(df, group_by))
+        aggregated_data[group_by] = cached
+    return cached[1].copy()
+
 def abbreviate_number(number, decimals=0):
     if number >= 1_000_000_000:
         return f"{number / 1_000_000_000:.{decimals if decimals > 0 else 2}f}B"
@@ -1,3 +1,4 @@
+from concurrent.futures import ThreadPoolExecutor
 import os
 from google.cloud import vision
 
@@ -7,36 +8,54 @@ root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 # Set the path to your JSON key file
 os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = os.path.join(root_dir, "hookify_gcvapi.json")
 
-# Detects unsafe features in the file.
-def detect_safe_search(image_content):
-    """ Detects unsafe features in the file."""
+# Limite de imagens por requisição do batch_annotate_images
+MAX_BATCH_SIZE = 16
+# Lotes enviados ao mesmo tempo
+MAX_WORKERS = 4
+
+LIKELIHOOD_NAME = (
+    "UNKNOWN",
+    "VERY_UNLIKELY",
+    "UNLIKELY",
+    "POSSIBLE",
+    "LIKELY",
+    "VERY_LIKELY",
+)
+
+# Detects unsafe features in several files, up to MAX_BATCH_SIZE per request.
+def detect_safe_search_batch(images_content):
+    """ Detects unsafe features in several files with one request per batch."""
     client = vision.ImageAnnotatorClient()
-    image = vision.Image(content=image_content)
-
-    response = client.safe_search_detection(image=image) # type: ignore
-    safe = response.safe_search_annotation
-
-    likelihood_name = (
-        "UNKNOWN",
-        "VERY_UNLIKELY",
-        "UNLIKELY",
-        "POSSIBLE",
-        "LIKELY",
-        "VERY_LIKELY",
-    )
-
-    results = {
-        "adult": likelihood_name[safe.adult],
-        "medical": likelihood_name[safe.medical],
-        "spoofed": likelihood_name[safe.spoof],
-        "violence": likelihood_name[safe.violence],
-        "racy": likelihood_name[safe.racy]
-    }
-
-    if response.error.message:
-        raise Exception(
-            "{}\nFor more info on error messages, check: "
-            "https://cloud.google.com/apis/design/errors".format(response.error.message)
-        )
-    
-    return results
\ No newline at end of file
+    feature = vision.Feature(type_=vision.Feature.Type.SAFE_SEARCH_DETECTION)
+
+    def annotate_batch(batch):
+        requests = [
+            vision.AnnotateImageRequest(image=vision.Image(content=image_content), features=[feature])
+            for image_content in batch
+        ]
+        return client.batch_annotate_images(requests=requests) # type: ignore
+
+    # Os lotes são enviados em paralelo (executor.map mantém a ordem das imagens)
+    batches = [images_content[i:i + MAX_BATCH_SIZE] for i in range(0, len(images_content), MAX_BATCH_SIZE)]
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        batch_responses = list(executor.map(annotate_batch, batches))
+
+    results = []
+    for batch_response in batch_responses:
+        for response in batch_response.responses:
+            if response.error.message:
+                raise Exception(
+                    "{}\nFor more info on error messages, check: "
+                    "https://cloud.google.com/apis/design/errors".format(response.error.message)
+                )
+
+            safe = response.safe_search_annotation
+            results.append({
+                "adult": LIKELIHOOD_NAME[safe.adult],
+                "medical": LIKELIHOOD_NAME[safe.medical],
+                "spoofed": LIKELIHOOD_NAME[safe.spoof],
+                "violence": LIKELIHOOD_NAME[safe.violence],
+                "racy": LIKELIHOOD_NAME[safe.racy]
+            })
+
+    return results
@@ -1,16 +1,37 @@
-from ast import literal_eval
+from concurrent.futures import ThreadPoolExecutor
+from http.cookiejar import DefaultCookiePolicy
 import time
 from matplotlib.font_manager import json_load
 import requests
+from requests.adapters import HTTPAdapter
 import json
 import urllib.parse
 import streamlit as st
 
+
+# Requisições em paralelo por carregamento (get_ads) e carregamentos simultâneos esperados no processo
+MAX_WORKERS = 8
+MAX_CONCURRENT_LOADS = 8
+
+# SESSÃO HTTP COMPARTILHADA NO PROCESSO (reaproveita conexões keep-alive com a Graph API)
+# Sem cookies: a sessão é usada por todos os usuários e a autenticação vai sempre no access_token
+# O pool comporta todos os workers de todos os carregamentos simultâneos (+1 da thread que pagina cada um)
+HTTP_SESSION = requests.Session()
+HTTP_SESSION.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+HTTP_SESSION.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=(MAX_WORKERS + 1) * MAX_CONCURRENT_LOADS))
+
+# CONSTANTS
+ACCOUNT_INFO_FIELDS = 'email,first_name,last_name,name,picture{url}'
+ADS_DETAILS_FIELDS = 'name,creative{actor_id,body,call_to_action_type,instagram_permalink_url,object_type,status,title,video_id,thumbnail_url},adcreatives{asset_feed_spec}'
+ADACCOUNTS_FIELDS = 'name,id,account_status,user_tasks,instagram_accounts{username,profile_pic,followed_by_count},business{name,id,picture}'
+ADS_INSIGHTS_FIELDS = 'actions,ad_id,ad_name,adset_id,adset_name,campaign_id,campaign_name,clicks,conversions,cost_per_conversion,impressions,inline_link_clicks,reach,spend,video_play_actions,video_thruplay_watched_actions,video_play_curve_actions,video_p50_watched_actions,website_ctr'
+
 class GraphAPI:
     def __init__(self, fb_api):
         self.base_url = "https://graph.facebook.com/v20.0/"
         self.user_token = "?access_token=" + fb_api
         self.page_token = None
+        self.page_tokens = {}
         self.api_fields = ""
         self.limit = 2000
         self.time_range = ""
@@ -19,18 +40,22 @@ class GraphAPI:
         self.action_attribution_windows = "['7d_click','1d_view']"
         self.use_account_attribution_setting = "true"
         self.action_breakdowns = "action_type"
+        self.details_batch_size = 50
+        self.details_ttl = 1800
+        self.page_token_ttl = 1800
+        self.max_workers = MAX_WORKERS
         
     def get_account_info(self):
         url = self.base_url + 'me' + self.user_token
         payload = {
-            'fields': 'email,first_name,last_name,name,picture{url}',
+            'fields': ACCOUNT_INFO_FIELDS,
         }
         try:
             # Debugging: Print the URL and payload
             print('get_account_info() > Request URL:', url)
             print('get_account_info() > Request Payload:', json.dumps(payload, indent=2))
-            response = requests.get(url, params=payload)
-            print('get_account_info() > response:', response.json())
+            response = HTTP_SESSION.get(url, params=payload)
+            print('get_account_info() > response:', response)
             response.raise_for_status()  # Check for HTTP errors
             return {'status': 'success', 'data': response.json()}
         except requests.exceptions.HTTPError as http_err:
@@ -44,26 +69,55 @@ class GraphAPI:
             print(f'get_account_info() > Other error occurred: {err}')  # Handle other errors
             return {'status': 'error', 'message': str(err)}
 
-    def get_page_access_token(self, actor_id):
+    def get_page_access_token(self, actor_id, page_tokens_cache=None):
+        # Tokens das páginas ficam no cache recebido de quem chama (por token do usuário) enquanto estiverem dentro do TTL;
+        # uma página que não está no cache força uma nova busca
+        page_tokens_cache = {} if page_tokens_cache is None else page_tokens_cache
+        cached = page_tokens_cache.get(self.user_token)
+        if cached is not None and time.time() - cached[0] <= self.page_token_ttl:
+            self.page_tokens = cached[1]
+
+        # Reaproveita o token da página já buscado
+        if actor_id in self.page_tokens:
+            self.page_token = self.page_tokens[actor_id]
+            return self.page_token
         url = self.base_url + 'me/accounts' + self.user_token
         try:
-            response = requests.get(url)
+            response = HTTP_SESSION.get(url)
             response.raise_for_status()
             pages = response.json().get('data', [])
-            for page in pages:
-                if page['id'] == actor_id:
-                    self.page_token = f"?access_token={page['access_token']}"
-                    print('get_page_access_token() > PAGE TOKEN:', self.page_token)
-                    return self.page_token
+            # Guarda os tokens de todas as páginas retornadas
+            self.page_tokens = {page['id']: f"?access_token={page['access_token']}" for page in pages}
+            page_tokens_cache[self.user_token] = (time.time(), self.page_tokens)
+            if actor_id in self.page_tokens:
+                self.page_token = self.page_tokens[actor_id]
+                print('get_page_access_token() > Got page token for', actor_id)
+                return self.page_token
             raise Exception(f"Page with ID {actor_id} not found")
         except requests.exceptions.RequestException as e:
             print(f"get_page_access_token() > Error getting page access token: {e}")
             raise Exception(f"get_page_access_token() > Error getting page access token: {e}")
         
-    def get_ads_details(self, act_id, time_range, ads_ids):
+    def submit_ads_details(self, executor, act_id, time_range, ads_ids, details_cache):
+        # Agenda no executor um lote por vez só para os IDs ausentes (ou expirados) no cache
+        now = time.time()
+        missing_ids = [ad_id for ad_id in ads_ids if ad_id not in details_cache or now - details_cache[ad_id][0] > self.details_ttl]
+        batches = [missing_ids[i:i + self.details_batch_size] for i in range(0, len(missing_ids), self.details_batch_size)]
+        return [executor.submit(self.get_ads_details_batch, act_id, time_range, batch) for batch in batches]
+
+    def collect_ads_details(self, details_cache, results, ads_ids):
+        if any(result is None for result in results):
+            return None
+        now = time.time()
+        for result in results:
+            for detail in result:
+                details_cache[detail['id']] = (now, detail)
+        return [details_cache[ad_id][1] for ad_id in ads_ids if ad_id in details_cache]
+
+    def get_ads_details_batch(self, act_id, time_range, ads_ids):
         url = self.base_url + act_id + '/ads' + self.user_token
         payload = {
-            'fields': 'name,creative{actor_id,body,call_to_action_type,instagram_permalink_url,object_type,status,title,video_id,thumbnail_url,effective_object_story_id{attachments,properties}},adcreatives{asset_feed_spec}',
+            'fields': ADS_DETAILS_FIELDS,
             'limit': self.limit,
             'level': self.level,
             'action_attribution_windows': self.action_attribution_windows,
@@ -80,7 +134,7 @@ class GraphAPI:
             # Debugging: Print the exact URL
             print('get_ads_details() > Request URL:', prepared.url)
 
-            insights_response = requests.get(url, params=payload)
+            insights_response = HTTP_SESSION.get(url, params=payload)
             insights_response.raise_for_status()
             data = insights_response.json()['data']
 
@@ -98,13 +152,13 @@ class GraphAPI:
     def get_adaccounts(self):
         url = self.base_url + 'me/adaccounts' + self.user_token
         payload = {
-            'fields': 'name,id,account_status,user_tasks,instagram_accounts{username,profile_pic,followed_by_count},business{name,id,picture}',
+            'fields': ADACCOUNTS_FIELDS,
         }
         try:
             # Debugging: Print the URL and payload
             print('get_adaccounts() > Request URL:', url)
             print('get_adaccounts() > Request Payload:', json.dumps(payload, indent=2))
-            response = requests.get(url, params=payload)
+            response = HTTP_SESSION.get(url, params=payload)
             print('get_adaccounts() > response:', response)
             response.raise_for_status()  # Check for HTTP errors
             return {'status': 'success', 'data': response.json()['data']}
@@ -119,14 +173,14 @@ class GraphAPI:
             print(f'get_adaccounts() > Other error occurred: {err}')  # Handle other errors
             return {'status': 'error', 'message': str(err)}
 
-    def get_ads(self, act_id, time_range, filters):
+    def get_ads(self, act_id, time_range, filters, details_cache=None):
         progressBar = st.progress(0, 'get_ads() > Getting ads...')
         url = self.base_url + act_id + '/insights' + self.user_token
         #filters.append("{'field': 'video_play_actions', 'operator': 'GREATER_THAN', 'value': '0'}")
         #filters.append("{'field': 'ad_name', 'operator': 'GREATER_THAN', 'value': '0'}")
         json_filters = [json.dumps(filter_dict) for filter_dict in filters]
         payload = {
-            'fields': 'actions,ad_id,ad_name,adset_id,adset_name,campaign_id,campaign_name,clicks,conversions,cost_per_conversion,cpm,ctr,frequency,impressions,inline_link_clicks,reach,spend,video_play_actions,video_thruplay_watched_actions,video_play_curve_actions,video_p50_watched_actions,website_ctr',
+            'fields': ADS_INSIGHTS_FIELDS,
             'limit': self.limit,
             'level': self.level,
             'action_attribution_windows': self.action_attribution_windows,
@@ -140,7 +194,7 @@ class GraphAPI:
             # Debugging: Print the URL and payload
             print('get_ads() > Request URL:', url)
             print('get_ads() > Request Payload:', json.dumps(payload, indent=2))
-            response = requests.post(url, params=payload)
+            response = HTTP_SESSION.post(url, params=payload)
             print('get_ads() > request_url:', response.url)
             response.raise_for_status()  # Check for HTTP errors
             ad_report_id = response.json().get('report_run_id')
@@ -154,7 +208,7 @@ class GraphAPI:
             # Polling for job completion
             status_url = self.base_url + ad_report_id
             while True:
-                status_response = requests.get(status_url + self.user_token)
+                status_response = HTTP_SESSION.get(status_url + self.user_token)
                 status_response.raise_for_status()
                 status_data = status_response.json()
                 
@@ -172,72 +226,76 @@ class GraphAPI:
             
             # Fetch insights
             insights_url = self.base_url + ad_report_id + '/insights' + self.user_token
-            insights_response = requests.get(insights_url)
+            insights_response = HTTP_SESSION.get(insights_url, params={'limit': self.limit})
             insights_response.raise_for_status()
-            data = insights_response.json()['data']
-
-            while 'paging' in insights_response.json() and 'next' in insights_response.json()['paging']:
-                progressBar.progress(85, 'get_ads() > Paginating...')
-                insights_response = requests.get(insights_response.json()['paging']['next'])
-                insights_response.raise_for_status()
-                data.extend(insights_response.json()['data'])
-
+            insights_json = insights_response.json()
+            data = insights_json['data']
 
             # Create a set of unique ad_name
             unique_ads = {}
 
-            # Iterate over the list of ads
-            for ad in data:
-                ad_name = ad["ad_name"]
-                ad_id = ad["ad_id"]
-                
-                # If ad_name is not already in the dictionary, add it with its id
-                if ad_name not in unique_ads:
-                    unique_ads[ad_name] = ad_id
+            def new_unique_ids(ads):
+                # IDs dos ad_name ainda não vistos (o primeiro ad_id de cada nome)
+                new_ids = []
+                for ad in ads:
+                    ad_name = ad["ad_name"]
+                    if ad_name not in unique_ads:
+                        unique_ads[ad_name] = ad["ad_id"]
+                        new_ids.append(ad["ad_id"])
+                return new_ids
+
+            # Os detalhes de cada página são buscados enquanto as próximas páginas ainda estão chegando
+            # Cache de detalhes recebido de quem chama (sem ele, só vale para esta busca)
+            details_cache = {} if details_cache is None else details_cache
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                details_futures = self.submit_ads_details(executor, act_id, time_range, new_unique_ids(data), details_cache)
+
+                # O link 'next' já carrega o mesmo limit, então cada página traz até self.limit linhas
+                while 'next' in insights_json.get('paging', {}):
+                    progressBar.progress(85, 'get_ads() > Paginating...')
+                    insights_response = HTTP_SESSION.get(insights_json['paging']['next'])
+                    insights_response.raise_for_status()
+                    insights_json = insights_response.json()
+                    data.extend(insights_json['data'])
+                    details_futures += self.submit_ads_details(executor, act_id, time_range, new_unique_ids(insights_json['data']), details_cache)
+
+                # Get details for unique ads
+                progressBar.progress(90, 'get_ads() > Collecting ads details...')
+                details_results = [future.result() for future in details_futures]
 
             # Convert the unique ads to a list of ids
             unique_ids = list(unique_ads.values())
-
-            # Get details for unique ads
-            progressBar.progress(90, 'get_ads() > Collecting ads details...')
-            ads_details = self.get_ads_details(act_id, time_range, unique_ids)
+            ads_details = self.collect_ads_details(details_cache, details_results, unique_ids)
             print('got ads_details')
 
             if ads_details is not None:
                 print('ads_details is not None')
                 # Create a dictionary of ad details
-                creative_list = {detail['name']: detail['creative'] for detail in ads_details}
-                videos_list = {
-                    detail['name']: detail['adcreatives']['data'][0]['asset_feed_spec']['videos']
-                    for detail in ads_details
-                    if 'asset_feed_spec' in detail['adcreatives']['data'][0] and 'videos' in detail['adcreatives']['data'][0]['asset_feed_spec']
-                }
+                creative_list = {}
+                videos_list = {}
+                for detail in ads_details:
+                    creative_list[detail['name']] = detail.get('creative')
+                    # Anúncio sem adcreatives fica sem lista de vídeos
+                    adcreatives_data = detail.get('adcreatives', {}).get('data')
+                    asset_feed_spec = adcreatives_data[0].get('asset_feed_spec') if isinstance(adcreatives_data, list) and adcreatives_data else None
+                    if isinstance(asset_feed_spec, dict) and 'videos' in asset_feed_spec:
+                        # IDs e thumbs dos vídeos por ad_name
+                        videos = asset_feed_spec['videos']
+                        videos_list[detail['name']] = ([video.get('video_id') for video in videos], [video.get('thumbnail_url') for video in videos])
 
-                print(f'creative list {creative_list}')
-                print(f'video list {videos_list}')
+                # Só os tamanhos dos dicionários
+                print(f'get_ads() > creatives: {len(creative_list)}, video lists: {len(videos_list)}')
 
                 # Update data with creative details
+                progressBar.text('get_ads() > Mixing everything up...')
+                get_creative = creative_list.get
+                get_videos = videos_list.get
                 for ad in data:
-                    progressBar.text('get_ads() > Mixing everything up...')
-                    #print(f'ad {ad['ad_name']}: start')
-                    ad['creative'] = creative_list.get(ad['ad_name'], None)
-                    adcreatives = videos_list.get(ad['ad_name'], None)
-                    video_ids = []
-                    video_thumbs = []
-                    # print(f'ad {ad_name}: ad["creative"] = {ad.creative} ')
-                    # print(f'ad {ad_name}: adcreatives = {adcreatives} ')
-                    if adcreatives is not None:
-                        for video in adcreatives:
-                            video_ids.append(video.get('video_id'))
-                            video_thumbs.append(video.get('thumbnail_url'))
-                            # print(f'ad {ad_name}: video_ids.append {video.get('video_id')}')
-                            # print(f'ad {ad_name}: video_thumbs.append {video.get('thumbnail_url')}')
-                    ad['adcreatives_videos_ids'] = video_ids
-                    ad['adcreatives_videos_thumbs'] = video_thumbs
-                    #print(f'ad {ad['ad_name']}: finish ad["creative"] = {ad['creative']} ')
-                    #print(f'ad {ad['ad_name']}: finish adcreatives = {adcreatives} ')
+                    ad_name = ad['ad_name']
+                    ad['creative'] = get_creative(ad_name, None)
+                    ad['adcreatives_videos_ids'], ad['adcreatives_videos_thumbs'] = get_videos(ad_name) or ([], [])
 
-                    progressBar.progress(100, 'get_ads() > Sucessfully loaded!')
+                progressBar.progress(100, 'get_ads() > Sucessfully loaded!')
 
             return data
         
@@ -251,47 +309,42 @@ class GraphAPI:
             return None
 
     ## GET VIDEO SOURCE URL
-    def get_video_source_url(self, video_id, actor_id):       
-
-        # token = None
-        # if source_type == 'creative':
-        #     token = self.user_token
-        # elif source_type == 'adcreative':
-        #     token = self.user_token
-
-        if actor_id is None or video_id is None:
-            st.error("Actor ID or Video ID is None")
-            raise Exception("Actor ID or Video ID is None")
-        else:
-            try:
-                # Busca VIDEO SOURCE URL
-                video_url = self.base_url + str(video_id) + self.get_page_access_token(actor_id)
-                video_payload = {
-                    'fields': 'source',
-                }
-
-                # Debugging: Print the URL and payload
-                req = requests.Request('GET', video_url, params=video_payload)
-                prepared = req.prepare()
-                # Debugging: Print the exact URL
-                print('get_video_source_url() > Request URL:', prepared.url)
+    def get_video_source_urls(self, video_ids, actor_id, page_tokens_cache=None):
+        # IDs da Graph API são numéricos: IDs inválidos (ex.: o 0 de preenchimento) são descartados sem buscar token nem vídeo
+        # Vários vídeos do mesmo actor numa única requisição (?ids=...)
+        video_ids = [str(video_id) for video_id in video_ids if str(video_id).isdigit() and int(video_id) != 0]
+        if actor_id is None or not str(actor_id).isdigit() or not video_ids:
+            print(f"get_video_source_urls() > Invalid IDs: video_ids={video_ids} actor_id={actor_id}")
+            return {'status': 'error', 'message': f"Invalid video IDs ({video_ids}) or actor ID ({actor_id})"}
+        try:
+            video_url = self.base_url + self.get_page_access_token(actor_id, page_tokens_cache)
+            video_payload = {
+                'ids': ','.join(video_ids),
+                'fields': 'source',
+            }
+            video_response = HTTP_SESSION.get(video_url, params=video_payload)
+            video_response.raise_for_status()
+            videos = video_response.json()
+            print(f'get_video_source_urls() > Got {len(videos)} of {len(video_ids)} video sources')
+            return {'status': 'success', 'data': {video_id: videos.get(video_id, {}).get('source') for video_id in video_ids}}
 
-                video_response = requests.get(video_url, params=video_payload)
-                video_response.raise_for_status()
-                video_source = video_response.json().get('source')
+        except requests.exceptions.HTTPError as http_err:
+            decoded_url = urllib.parse.unquote(http_err.request.url) # type: ignore
+            decoded_text = urllib.parse.unquote(http_err.response.text)
+            error = http_err.response.json().get('error', {})
+            print(f"get_video_source_urls() > HTTP error occurred: {http_err.response.status_code} {decoded_text} for URL: {decoded_url}")
+            # Um ID apagado ou inacessível derruba o lote inteiro: busca cada vídeo separadamente
+            if len(video_ids) > 1:
+                return self.get_video_source_urls_by_id(video_ids, actor_id, page_tokens_cache)
+            return {'status': f"Status: {http_err.response.status_code} - http_error ({error.get('code')})", 'message': error.get('message')}
+        except Exception as err:
+            print(f"get_video_source_urls() > Other error occurred: {err}")
+            return {'status': 'error', 'message': str(err)}
 
-                if video_source:
-                    print('get_video_source_url() > Video source:', video_source)
-                    return video_source
-                
-            except requests.exceptions.HTTPError as http_err:
-                decoded_url = urllib.parse.unquote(http_err.request.url) # type: ignore
-                decoded_text = urllib.parse.unquote(http_err.response.text)
-                error_code = http_err.response.json().get('error', {}).get('code')
-                error_message = literal_eval(decoded_text)['error']['message']
-                print(f"get_video_source_url() > HTTP error occurred: {http_err.response.status_code} {decoded_text} for URL: {decoded_url}")
-                return {'status': f"Status: {http_err.response.status_code} - http_error ({error_code})", 'message': error_message}
-            
-            except Exception as err:
-                print(f"get_video_source_url() > Other error occurred: {err}")
-                return {'status': 'error', 'message': str(err)}
\ No newline at end of file
+    def get_video_source_urls_by_id(self, video_ids, actor_id, page_tokens_cache=None):
+        # Vídeos que falharem ficam como None; só devolve erro se nenhum vídeo carregar
+        responses = {video_id: self.get_video_source_urls([video_id], actor_id, page_tokens_cache) for video_id in video_ids}
+        sources = {video_id: response['data'][video_id] for video_id, response in responses.items() if response['status'] == 'success'}
+        if not sources:
+            return next(iter(responses.values()))
+        return {'status': 'success', 'data': {video_id: sources.get(video_id) for video_id in video_ids}}
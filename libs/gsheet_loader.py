@@ -1,3 +1,4 @@
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 import gspread
 import streamlit as st
@@ -116,7 +117,7 @@ class DataLoader:
             st.error(f"Erro ao carregar a planilha '{sheet_name} > {aba_name}': {str(e)}")
             return pd.DataFrame()
         
-    def load_gsheet_paginated(self, sheet_name, aba_name, page_size=5000):
+    def load_gsheet_paginated(self, sheet_name, aba_name, page_size=5000, max_workers=8):
         try:
             worksheet = self.client.open(sheet_name).worksheet(aba_name)
             headers = worksheet.row_values(1)
@@ -125,15 +126,22 @@ class DataLoader:
             
             total_rows = worksheet.row_count
             last_col = chr(ord('A') + num_cols - 1)
-            
+
+            # Com o total de linhas conhecido, todas as faixas são montadas de antemão
+            ranges = []
             for start_row in range(2, total_rows + 1, page_size):
                 end_row = min(start_row + page_size - 1, total_rows)
                 print(f"carrengado da {start_row} à {end_row} linha")
-                range_str = f'A{start_row}:{last_col}{end_row}'
-                chunk = worksheet.get(range_str)
-                # Ensure each row has correct number of columns
-                chunk = [row + [''] * (num_cols - len(row)) for row in chunk]
-                all_data.extend(chunk)
+                ranges.append(f'A{start_row}:{last_col}{end_row}')
+
+            # Busca as faixas em paralelo (executor.map mantém a ordem das linhas)
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                for chunk in executor.map(worksheet.get, ranges):
+                    # Ensure each row has correct number of columns
+                    for row in chunk:
+                        if len(row) < num_cols:
+                            row.extend([''] * (num_cols - len(row)))
+                    all_data.extend(chunk)
                 
             return pd.DataFrame(all_data, columns=headers)
         except Exception as e:
@@ -1,14 +1,13 @@
 from ast import literal_eval
 from enum import unique
-import pandas as pd
 import streamlit as st
 from datetime import date
-from components.elements import bt_delete
+from components.elements import pack_card
 from libs.graph_api import GraphAPI
-from libs.dataformatter import add_ads_pack, format_ads_data, getInitials, remove_ads_pack
+from libs.dataformatter import AdsPack, add_ads_pack, format_ads_data, getInitials, remove_ads_pack
 from streamlit_extras.mandatory_date_range import date_range_picker
 
-from libs.session_manager import get_session_access_token, get_session_ads_data
+from libs.session_manager import get_or_init, get_session_access_token, get_session_ads_data
 
 # Initialize ACCESS TOKEN (api_key)
 api_key = get_session_access_token()
@@ -36,11 +35,12 @@ def construct_filter(field, operator, value):
     """Construct a filter dictionary."""
     return {'field': field, 'operator': operator, 'value': value}
 
-@st.cache_data(show_spinner=False)
-def cached_get_ads(api_key, act_id, time_range, filters):
-    """Cache the ads retrieval."""
+# Com TTL (insights de períodos que incluem hoje mudam) e limite de entradas (cada pack é grande)
+@st.cache_data(show_spinner=False, ttl=1800, max_entries=32)
+def cached_get_ads(api_key, act_id, time_range, filters, _details_cache):
+    """Cache the ads retrieval (_details_cache não entra no hash do cache)."""
     graph_api = GraphAPI(api_key)
-    return graph_api.get_ads(act_id, time_range, filters)
+    return graph_api.get_ads(act_id, time_range, filters, _details_cache)
 
 
 # CRIA BARRA DE TITULO
@@ -97,7 +97,8 @@ if api_key and 'account_info' in st.session_state and 'adaccounts' in st.session
             for filter_name, filter_field in filter_options.items():
                 with st.expander(filter_name):
                     operator = st.selectbox(f'Operator', operator_options, key=f'operator_{filter_name}', label_visibility='collapsed')
-                    value = st.text_input(f'Value', key=f'value_{filter_name}')
+                    # Normaliza o valor já na entrada: valores só com espaços não viram filtro na API
+                    value = st.text_input(f'Value', key=f'value_{filter_name}').strip()
                     if value:
                         filters.append(construct_filter(filter_field, operator, value))
         create_filters()
@@ -108,17 +109,24 @@ if api_key and 'account_info' in st.session_state and 'adaccounts' in st.session
             st.session_state['act_selected'] = selected_adaccount
             st.session_state['time_range'] = time_range
             st.session_state['filters'] = filters
-            with st.spinner('Loading your ADs, please wait...'):
-                ads_data = cached_get_ads(api_key, selected_act_id, time_range, filters)
-                if ads_data:
-                    unique_id = f"{selected_adaccount}&{selected_act_id}&{time_range}&{filters}"
-                    add_ads_pack(unique_id, ads_data)
-                    st.rerun()
-                elif ads_data == []:
-                    st.session_state['ads_data'] = []
-                    st.error(f'⛔ No ADs found with these filters.')
-                else:
-                    st.error(f'😵‍💫 Failed to fetch data from Meta API: {ads_data}')
+            unique_id = f"{selected_adaccount}&{selected_act_id}&{time_range}&{filters}"
+            # Pack já carregado: não busca, formata nem concatena de novo (evita linhas duplicadas)
+            if unique_id in st.session_state['loaded_ads']:
+                st.warning('⚠️ This pack is already loaded.')
+            else:
+                with st.spinner('Loading your ADs, please wait...'):
+                    # Detalhes dos anúncios já buscados nesta sessão (a função em cache preenche o mesmo dicionário)
+                    details_cache = get_or_init('ads_details_cache', {})
+                    ads_data = cached_get_ads(api_key, selected_act_id, time_range, filters, details_cache)
+                    if ads_data:
+                        pack_info = AdsPack(account=selected_adaccount, act_id=selected_act_id, time_range=literal_eval(time_range), filters=list(filters))
+                        add_ads_pack(unique_id, ads_data, pack_info)
+                        st.rerun()
+                    elif ads_data == []:
+                        st.session_state['ads_data'] = []
+                        st.error(f'⛔ No ADs found with these filters.')
+                    else:
+                        st.error(f'😵‍💫 Failed to fetch data from Meta API: {ads_data}')
 
         df_ads_data = get_session_ads_data()
         if df_ads_data:
@@ -156,55 +164,5 @@ if api_key and 'account_info' in st.session_state and 'adaccounts' in st.session
                 if item_index < num_items:
                     with grid_cols[col]:
                         with st.container(border=True, key=("bt_delete_" + f"{item_index}")):
-                            cols_header = st.columns([4, 1])
-                            with cols_header[0]:
-                                st.markdown(f'#### Pack {item_index + 1}')
-                            with cols_header[1]:
-                                button = bt_delete(item_index, remove_ads_pack)
-
                             unique_id = st.session_state['loaded_ads'][item_index]
-                            info = unique_id.split('&')
-                            df_pack_ads = st.session_state[f"{unique_id}_ads_data"]
-
-                            # COUNTS
-                            st.dataframe(
-                                pd.DataFrame([{
-                                "Campaigns": df_pack_ads["campaign_name"].nunique(), 
-                                "Adsets": df_pack_ads["adset_name"].nunique(), 
-                                "ADs": len(df_pack_ads)
-                            }]), hide_index=True, use_container_width=True )
-
-                            st.caption(F"{info[0]} ({info[1]})")
-
-                            # # AD ACCOUNT
-                            # cols_act = st.columns([1,3])
-                            # with cols_act[0]:
-                            #     st.caption("Account:")
-                            # with cols_act[1]:
-                            #     st.markdown(f"{info[0]}")
-
-                            # # AD ACCOUNT ID
-                            # cols_act_id = st.columns([1,3])
-                            # with cols_act_id[0]:
-                            #     st.caption("ID:")
-                            # with cols_act_id[1]:
-                            #     st.markdown(f"{info[1]}")
-
-                            # TIME RANGE
-                            item_time_range = literal_eval(info[2])
-                            cols_time_range = st.columns([1,3])
-                            with cols_time_range[0]:
-                                st.caption("Date:")
-                            with cols_time_range[1]:
-                                st.markdown(pd.to_datetime(item_time_range["since"]).strftime("%d/%m/%Y") + " *:gray[→]* " + pd.to_datetime(item_time_range["until"]).strftime("%d/%m/%Y"))
-
-                            # FILTERS
-                            item_filters = literal_eval(info[3])
-                            cols_filters = st.columns([1,3])
-                            with cols_filters[0]:
-                                st.caption("Filters:")
-                            with cols_filters[1]:
-                                if item_filters != []:
-                                    st.markdown("\n".join(f'{str(filter["field"].split(".")[0]).capitalize()} *:gray[{str(filter["operator"]).lower()}]* **{filter["value"]}**' for filter in item_filters))
-                                else:
-                                    st.caption("None")
\ No newline at end of file
+                            pack_card(item_index, unique_id, on_delete=remove_ads_pack)
@@ -1,12 +1,12 @@
 from ast import literal_eval
-from collections import Counter
+from collections import defaultdict
 import json
 from shlex import join
 import numpy as np
 import pandas as pd
 import streamlit as st
 from components.advanced_options import AdvancedOptions
-from libs.dataformatter import aggregate_dataframe
+from libs.dataformatter import get_session_aggregated_data
 from libs.gsheet_loader import K_CENTRAL_CAPTURA, K_CENTRAL_VENDAS, K_GRUPOS_WPP, K_PCOPY_DADOS, K_PTRAFEGO_DADOS, clear_df, get_df
 from libs.session_manager import get_session_ads_data, has_session_ads_data
 
@@ -76,7 +76,7 @@ if df_ads_data is not None:
         df_ads_data = options['df_ads_data'].copy()
 
         # CRIA AGRUPAMENTO POR NOME DO ANÚNCIO (ad_name)
-        df_grouped = aggregate_dataframe(df_ads_data, group_by='ad_name')
+        df_grouped = get_session_aggregated_data(df_ads_data, group_by='ad_name')
         if group_by_ad:
             df_ads_data = df_grouped
 
@@ -109,36 +109,26 @@ if df_ads_data is not None:
         else:
             st.error("Missing ad_name or adset_name columns in df_ads_data.")
     
-    def create_count_dict(values, question):
-        """ Cria dicionário de categorias com base nas opções de resposta da pergunta """
-        counts = Counter(values)
-        categories = question.keys()
-        return {cat: counts.get(cat, 0) for cat in categories}
-
-    def calculate_cplmax(val, question):
-        if pd.isna(val):
-            return None
-        try:
-            cplmax = 0
-            # Para cada opção da pergunta
-            for option in question.keys():
-                # Calcula o CPLMAX para a opção
-                temp = val[option] * question[option]
-                # Agrega o valor
-                cplmax += temp
-            # Ao final, multiplca pelo ticket liquido
-            cplmax = cplmax * TICKET_LIQUIDO["EI21"]
-            return cplmax
-        except:
-            return {}
-        
-    def sum_total_pesquisas(x):
-        if x is None:
-            return None
-        elif isinstance(x, dict):
-            return sum(x.values())
-        else:
-            return x
+    def count_answers(df_pesquisas, question, rates):
+        """ Conta, em uma única passada, as respostas de cada opção da pergunta por unique_id (uma coluna por opção) """
+        options = list(rates.keys())
+        position = {option: i for i, option in enumerate(options)}
+        counts = defaultdict(lambda: [0] * len(options))
+        for unique_id, answer in zip(df_pesquisas["unique_id"], df_pesquisas[question]):
+            if pd.isna(unique_id):
+                continue
+            # Respostas fora das opções só registram o unique_id (todas as contagens em 0)
+            option_counts = counts[unique_id]
+            i = position.get(answer)
+            if i is not None:
+                option_counts[i] += 1
+        return pd.DataFrame.from_dict(dict(counts), orient='index', columns=options)
+
+    def calculate_cplmax(counts, question):
+        """ CPL máximo por unique_id: contagens x taxas de cada opção, vezes o ticket líquido """
+        # Produto matricial sobre as contagens de todos os unique_id
+        rates = np.array([question[option] for option in counts.columns], dtype=float)
+        return pd.Series(counts.to_numpy(dtype=float) @ rates * TICKET_LIQUIDO["EI21"], index=counts.index)
 
     def calculate_ad_medio(df):
         """ Retorna médias das métricas de otimização dos anúncios """
@@ -166,25 +156,26 @@ if df_ads_data is not None:
     # CRIA COLUNA 'unique_id' NOS DATAFRAMES
     add_unique_id(df_ads_data, df_ptrafego_dados_pago)
 
-    # AGREGA COLUNAS DE QUALIFICAÇÃO NOS DADOS DOS ANÚNCIOS
-    df_qualificacao_agg = df_ptrafego_dados_pago.groupby("unique_id").agg({
-        question: QUESTIONS_DICT[question]["type"] for question in QUESTIONS_DICT.keys()
-    }).reset_index()
-
-    # CRIA COLUNAS COM AS DISTRIBUIÇÕES DAS RESPOSTAS
-    for question in QUESTIONS_DICT.keys():
-        df_qualificacao_agg[question] = df_qualificacao_agg[question].apply(lambda x: create_count_dict(x, QUESTIONS_DICT[question]["rates"]))
+    # AGREGA COLUNAS DE QUALIFICAÇÃO NOS DADOS DOS ANÚNCIOS (distribuição das respostas por unique_id)
+    answers_counts = {
+        question: count_answers(df_ptrafego_dados_pago, question, QUESTIONS_DICT[question]["rates"]) for question in QUESTIONS_DICT.keys()
+    }
+    df_qualificacao_agg = pd.DataFrame({
+        **{question: pd.Series(counts.to_dict('index'), dtype=object) for question, counts in answers_counts.items()},
+        # CPL MAX e total de pesquisas calculados por unique_id, antes do merge
+        'CPL_MAX_PATRIMONIO': calculate_cplmax(answers_counts['PATRIMONIO'], TAXAS_PATRIMONIO),
+        'CPL_MAX_RENDA_MENSAL': calculate_cplmax(answers_counts['RENDA MENSAL'], TAXAS_RENDA_MENSAL),
+        'total_pesquisas': answers_counts['PATRIMONIO'].sum(axis=1),
+    }).rename_axis("unique_id").reset_index()
 
     # ADD QUALIFICAÇÃO NOS DADOS DOS ANÚNCIOS
     df_completo = df_ads_data.merge(df_qualificacao_agg, how='left', on='unique_id')
 
     # CPL MAX: PATRIMONIO
-    df_completo['CPL_MAX_PATRIMONIO'] = df_completo['PATRIMONIO'].apply(calculate_cplmax, question=TAXAS_PATRIMONIO)
     df_completo['MARGEM_ABS_PATRIMONIO'] = df_completo['CPL_MAX_PATRIMONIO'] - df_completo['cost_per_conversion.offsite_conversion.fb_pixel_custom.TYP_Captacao_Evento']
     df_completo['MARGEM_PERCENT_PATRIMONIO'] = df_completo['MARGEM_ABS_PATRIMONIO'] / df_completo['CPL_MAX_PATRIMONIO'] if df_completo['CPL_MAX_PATRIMONIO'] is not None else None
 
     # CPL MAX: RENDA MENSAL
-    df_completo['CPL_MAX_RENDA_MENSAL'] = df_completo['RENDA MENSAL'].apply(calculate_cplmax, question=TAXAS_RENDA_MENSAL)
     df_completo['MARGEM_ABS_RENDA_MENSAL'] = df_completo['CPL_MAX_RENDA_MENSAL'] - df_completo['cost_per_conversion.offsite_conversion.fb_pixel_custom.TYP_Captacao_Evento']
     df_completo['MARGEM_PERCENT_RENDA_MENSAL'] = df_completo['MARGEM_ABS_RENDA_MENSAL'] / df_completo['CPL_MAX_RENDA_MENSAL'] if df_completo['CPL_MAX_RENDA_MENSAL'] is not None else None
 
@@ -194,8 +185,7 @@ if df_ads_data is not None:
     df_completo['MARGEM_PERCENT_MEDIO'] = df_completo['MARGEM_ABS_MEDIO'] / df_completo['CPL_MAX_MEDIO'] if df_completo['CPL_MAX_MEDIO'] is not None else None
 
     # CONVERSÃO DA PÁGINA
-    df_completo['page_conversion'] = df_completo.apply(lambda row: row['conversions.offsite_conversion.fb_pixel_custom.TYP_Captacao_Evento'] / row['actions.landing_page_view'] if row['actions.landing_page_view'] != 0 else pd.NA, axis=1)
-    df_completo['total_pesquisas'] = df_completo['PATRIMONIO'].apply(sum_total_pesquisas)
+    df_completo['page_conversion'] = df_completo['conversions.offsite_conversion.fb_pixel_custom.TYP_Captacao_Evento'] / df_completo['actions.landing_page_view'].where(df_completo['actions.landing_page_view'] != 0)
     df_completo['taxa_de_resposta'] = df_completo['total_pesquisas'] / df_completo['conversions.offsite_conversion.fb_pixel_custom.TYP_Captacao_Evento']
 
     # DEFINE COLUNAS APRESENTADAS
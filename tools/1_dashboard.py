@@ -1,10 +1,8 @@
-import pandas as pd
 import streamlit as st
-import altair as alt
 from components.advanced_options import AdvancedOptions
-from libs.dataformatter import abbreviate_number, aggregate_dataframe
+from components.elements import build_retention_chart
+from libs.dataformatter import abbreviate_number, get_session_aggregated_data
 from libs.session_manager import get_session_ads_data
-from styles.styler import COLORS
 
 ### INICIA INTERFACE ###
 st.title('📊 Dashboard')
@@ -13,30 +11,6 @@ st.divider()
 
 st.query_params.clear()
 
-def build_retention_chart(video_play_curve_actions):
-    play_curve_metrics = pd.DataFrame(video_play_curve_actions).reset_index()
-    play_curve_metrics.columns = ['index', 'value']
-    play_curve_chart = alt.Chart(play_curve_metrics).mark_area( # type: ignore
-        interpolate='basis', # type: ignore
-        line=True, # type: ignore
-        point=True, # type: ignore
-        color=alt.Gradient( # type: ignore
-            gradient='linear', 
-            stops=[alt.GradientStop(color='#172654', offset=0), # type: ignore
-                alt.GradientStop(color='#61a7f9', offset=1)], # type: ignore
-            x1=1,
-            x2=1,
-            y1=1,
-            y2=0
-        )
-    ).encode(
-        x=alt.X('index', title='Retention per second (%)'), # type: ignore
-        y=alt.Y('value', title=None), # type: ignore
-    ).configure(
-        background = COLORS['BLACK_500']
-    )
-    return st.altair_chart(play_curve_chart, use_container_width=True, theme=None)
-
 # SE JÁ TEM DADOS DE ANÚNCIOS
 df_ads_data = get_session_ads_data()
 if df_ads_data is not None:
@@ -53,7 +27,7 @@ if df_ads_data is not None:
         df_ads_data = options['df_ads_data']
 
         df_ads_data['unify'] = 1
-        agg_df = aggregate_dataframe(df_ads_data, group_by='unify')
+        agg_df = get_session_aggregated_data(df_ads_data, group_by='unify')
         summarized_row = agg_df.iloc[0]
 
         cols = st.columns([3,4,3], gap='small')
@@ -150,11 +124,11 @@ if df_ads_data is not None:
                 st.subheader('🗂️ Loaded ADs')
                 loaded = st.columns(3)
                 with loaded[0]:
-                    st.metric('ADs', len(set(summarized_row["ad_id"])))
+                    st.metric('ADs', len(summarized_row["ad_id"]))
                 with loaded[1]:
-                    st.metric('Adsets', len(set(summarized_row["adset_id"])))
+                    st.metric('Adsets', len(summarized_row["adset_id"]))
                 with loaded[2]:
-                    st.metric('Campaigns', len(set(summarized_row["campaign_id"])))
+                    st.metric('Campaigns', len(summarized_row["campaign_id"]))
 
 else:
     st.warning('⬅️ First, load ADs in the sidebar.')
\ No newline at end of file
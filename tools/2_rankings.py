@@ -1,14 +1,13 @@
 import numpy as np
-import pandas as pd
-import altair as alt
 import streamlit as st
 from st_aggrid import AgGrid, GridOptionsBuilder, GridUpdateMode, JsCode
 from components.advanced_options import AdvancedOptions
 from libs.graph_api import GraphAPI
-from libs.dataformatter import aggregate_dataframe, create_agg_rules
-from libs.session_manager import get_session_access_token, get_session_ads_data
-from styles.styler import AGGRID_THEME, COLORS
+from libs.dataformatter import get_session_aggregated_data
+from libs.session_manager import get_or_init, get_session_access_token, get_session_ads_data
+from styles.styler import AGGRID_THEME
 from components.components import component_adinfo, component_adinfo_byad
+from components.elements import build_retention_chart
 
 # CRIA BARRA DE TITULO
 cols = st.columns([2,1])
@@ -21,43 +20,26 @@ with cols[1]:
 
 st.divider()
 
-def build_retention_chart(video_play_curve_actions):
-    play_curve_metrics = pd.DataFrame(video_play_curve_actions).reset_index()
-    play_curve_metrics.columns = ['index', 'value']
-    play_curve_chart = alt.Chart(play_curve_metrics).mark_area( # type: ignore
-        interpolate='basis', # type: ignore
-        line=True, # type: ignore
-        point=True, # type: ignore
-        color=alt.Gradient( # type: ignore
-            gradient='linear', 
-            stops=[alt.GradientStop(color='#172654', offset=0), # type: ignore
-                alt.GradientStop(color='#61a7f9', offset=1)], # type: ignore
-            x1=1,
-            x2=1,
-            y1=1,
-            y2=0
-        )
-    ).encode(
-        x=alt.X('index', title='Retention per second (%)'), # type: ignore
-        y=alt.Y('value', title=None), # type: ignore
-    ).configure(
-        background = COLORS['BLACK_500']
-    )
-    return st.altair_chart(play_curve_chart, use_container_width=True, theme=None)
-
 # SE JÁ TEM DADOS DE ANÚNCIOS
 df_ads_data = get_session_ads_data()
 if df_ads_data is not None:
 
     # INICIALIZA API KEY E GRAPH API
     api_key = get_session_access_token()
-    graph_api = GraphAPI(api_key)
+
+    # TOKENS DAS PÁGINAS DA SESSÃO (lidos aqui e passados às funções em cache, que não acessam o st.session_state)
+    page_tokens_cache = get_or_init('page_tokens_cache', {})
 
     # BUSCA VIDEO SOURCE URL
-    @st.cache_data(show_spinner=False)
-    def get_cached_video_source_url(video_id, actor_id):
-        response = graph_api.get_video_source_url(video_id, actor_id)
-        return response
+    # Cache por usuário (api_key na chave) e com TTL, já que a URL do vídeo é assinada e expira
+    @st.cache_data(show_spinner=False, ttl=1800, max_entries=4096)
+    def get_cached_video_source_urls(api_key, video_ids, actor_id, _page_tokens_cache):
+        graph_api = GraphAPI(api_key)
+        response = graph_api.get_video_source_urls(video_ids, actor_id, _page_tokens_cache)
+        # Erros são levantados para não ficarem em cache
+        if response['status'] != 'success':
+            raise Exception(response['status'] + '\n\n' + str(response['message']))
+        return response['data']
 
     # DIALOG PREVIEW VIDEO
     @st.dialog("AD preview")
@@ -67,30 +49,11 @@ if df_ads_data is not None:
             if 'creative.video_id' in selected_row and selected_row['creative.video_id'] != 0:
                 video_id = selected_row['creative.video_id']
                 actor_id = selected_row['creative.actor_id']
-                video_source_url = get_cached_video_source_url(video_id, actor_id)
-                if video_source_url is not None:
-                    if 'status' not in video_source_url:
-                        st.markdown(
-                            f"""<iframe
-                                width='100%'
-                                height='auto'
-                                style='border:none;border-radius:6px;overflow:hidden;aspect-ratio:9/16'
-                                src='{video_source_url}'
-                                allow='clipboard-write; encrypted-media; picture-in-picture; web-share'
-                                allowfullscreen='true'
-                                frameborder='0'
-                                scrolling='no'>
-                            </iframe>"""
-                        ,unsafe_allow_html=True)
-                    else:
-                        st.error("Couldn't load the video.\n\n Error: " + video_source_url['status'] + '\n\n' + video_source_url['message'])
+                try:
+                    video_source_url = get_cached_video_source_urls(api_key, (video_id,), actor_id, page_tokens_cache).get(str(video_id))
+                except Exception as err:
+                    st.error("Couldn't load the video.\n\n Error: " + str(err))
                 else:
-                    st.error("Couldn't load the video.\n\n Error: video_source_url is None")
-            elif 'adcreatives_videos_ids':
-                video_id = selected_row['adcreatives_videos_ids']
-                actor_id = selected_row['creative.actor_id']
-                for video in video_id:
-                    video_source_url = get_cached_video_source_url(video, actor_id)
                     if video_source_url is not None:
                         st.markdown(
                             f"""<iframe
@@ -105,17 +68,46 @@ if df_ads_data is not None:
                             </iframe>"""
                         ,unsafe_allow_html=True)
                     else:
-                        st.error('Falha ao carregar o vídeo')
+                        st.error("Couldn't load the video.\n\n Error: video_source_url is None")
+            elif 'adcreatives_videos_ids' in selected_row and selected_row['adcreatives_videos_ids']:
+                video_ids = tuple(selected_row['adcreatives_videos_ids'])
+                actor_id = selected_row['creative.actor_id']
+                # Todos os vídeos do anúncio numa única chamada
+                try:
+                    video_sources = get_cached_video_source_urls(api_key, video_ids, actor_id, page_tokens_cache)
+                except Exception as err:
+                    st.error("Couldn't load the videos.\n\n Error: " + str(err))
+                else:
+                    for video_source_url in video_sources.values():
+                        if video_source_url is not None:
+                            st.markdown(
+                                f"""<iframe
+                                    width='100%'
+                                    height='auto'
+                                    style='border:none;border-radius:6px;overflow:hidden;aspect-ratio:9/16'
+                                    src='{video_source_url}'
+                                    allow='clipboard-write; encrypted-media; picture-in-picture; web-share'
+                                    allowfullscreen='true'
+                                    frameborder='0'
+                                    scrolling='no'>
+                                </iframe>"""
+                            ,unsafe_allow_html=True)
+                        else:
+                            st.error('Falha ao carregar o vídeo')
 
     # SORT AGGRID
     def resort_by(df, column_name):
-        df_sorted = df.sort_values(by=column_name, ascending=True if 'cost_per_' in column_name else False).copy().reset_index(drop=True)
+        # O índice é mantido: é a chave estável da linha na grade (row_key)
+        df_sorted = df.sort_values(by=column_name, ascending=True if 'cost_per_' in column_name else False)
         df_sorted['#'] = range(1, len(df_sorted) + 1)
         st.session_state['ranking_sorting'] = column_name
         return df_sorted
 
     # CRIA AGGRID
     def create_aggrid(df_ads_data, cost_column, results_column):
+        # A grade recebe só as colunas exibidas (e as lidas pelo valueGetter)
+        grid_columns = list(dict.fromkeys(interest_columns + ['adset_name', 'creative.thumbnail_url']))
+        df_grid = df_ads_data[[col for col in grid_columns if col in df_ads_data.columns]].assign(row_key=df_ads_data.index)
         builder = GridOptionsBuilder.from_dataframe(df_ads_data[interest_columns])
         builder.configure_selection(selection_mode='single')
         builder.configure_grid_options(
@@ -179,12 +171,11 @@ if df_ads_data is not None:
                         },
                         minWidth=120
                     )
-        for col in df_ads_data.columns:
-            if col not in interest_columns:
-                builder.configure_column(col, hide=True)
+        for col in df_grid.columns.difference(interest_columns, sort=False):
+            builder.configure_column(col, hide=True)
         grid_options = builder.build()
         return AgGrid(
-            data=df_ads_data,
+            data=df_grid,
             custom_css=AGGRID_THEME,
             gridOptions=grid_options,
             update_mode=GridUpdateMode.MODEL_CHANGED,
@@ -205,7 +196,7 @@ if df_ads_data is not None:
         df_ads_data = options['df_ads_data'].copy()
 
         # CRIA AGRUPAMENTO POR NOME DO ANÚNCIO (ad_name)
-        df_grouped = aggregate_dataframe(df_ads_data, group_by='ad_name')
+        df_grouped = get_session_aggregated_data(df_ads_data, group_by='ad_name')
         if group_by_ad:
             df_ads_data = df_grouped
 
@@ -227,13 +218,8 @@ if df_ads_data is not None:
         ]
 
         # AVERAGE METRICS
-        avg_retention_at_3 = df_grouped['retention_at_3'].mean()
-        avg_ctr = df_grouped['ctr'].mean()
-        avg_spend = df_grouped['spend'].mean()
-        avg_cost = df_grouped[df_grouped[cost_column] > 0][cost_column].mean()
-        # TOTAL METRICS
-        total_plays = df_ads_data['total_plays'].sum()
-        total_thruplays = df_ads_data['total_thruplays'].sum()
+        avg_retention_at_3, avg_ctr, avg_spend = df_grouped[['retention_at_3', 'ctr', 'spend']].mean()
+        avg_cost = df_grouped[cost_column].where(df_grouped[cost_column] > 0).mean()
 
         ### INICIA INTERFACE ###
         col1, col2 = st.columns([5, 4], gap='medium')
@@ -267,8 +253,10 @@ if df_ads_data is not None:
             if not df_ads_data.empty:
                 selected_row_data = df_ads_data.head(1).to_dict(orient='records')[0]
             if grid_response and 'selected_rows' in grid_response and grid_response.selected_rows is not None:
-                selected_row_data = grid_response.selected_rows.iloc[0]
-                selected_row_data['#'] = grid_response.selected_rows.iloc[0].index
+                # A linha completa vem do dataframe pela chave da linha (row_key), já que a grade só leva as colunas exibidas
+                row_key = int(grid_response.selected_rows.iloc[0]['row_key'])
+                if row_key in df_ads_data.index:
+                    selected_row_data = df_ads_data.loc[row_key]
 
         ## DETAILED INFO
         with col2:
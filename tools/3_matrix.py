@@ -2,10 +2,11 @@ from unittest import result
 from altair import layer
 import streamlit as st
 import plotly.graph_objects as go
+import numpy as np
 import pandas as pd
 from components.advanced_options import AdvancedOptions
 
-from libs.dataformatter import aggregate_dataframe
+from libs.dataformatter import get_session_aggregated_data
 from libs.session_manager import get_session_access_token, get_session_ads_data
 from styles.styler import BLACK_100, BLACK_300, BLACK_400, BLACK_500, BLACK_700, BLUE_300, BLUE_500, GREEN_500, GREY_300, GREY_700
 
@@ -36,13 +37,14 @@ def build_matrix(df, cost_column, results_column):
     max_cpr = df[cost_column].max()
     min_cpr = df[cost_column].min()
 
-    def get_color(cpr):
+    def get_colors(cpr):
         if max_cpr == min_cpr:
-            return "yellow"
-        normalized = (cpr - min_cpr) / (max_cpr - min_cpr)
-        r = int(255 * normalized)
-        g = int(255 * (1 - normalized))
-        return f"rgb({r}, {g}, 0)"
+            return ["yellow"] * len(cpr)
+        # CPR ausente fica no meio da escala
+        normalized = np.nan_to_num((cpr - min_cpr) / (max_cpr - min_cpr), nan=0.5)
+        r = (255 * normalized).astype(int)
+        g = (255 * (1 - normalized)).astype(int)
+        return [f"rgb({red}, {green}, 0)" for red, green in zip(r, g)]
 
     # Create the scatter plot
     fig = go.Figure(layout=dict(height=600))
@@ -61,30 +63,36 @@ def build_matrix(df, cost_column, results_column):
         hoverinfo='text'
     ))
 
-    # Add images
-    for index, row in df.iterrows():
-        image_size = normalize_size(row[results_column], 1, 4)
-        image_color = get_color(row[cost_column])
-
-        # Add colored rectangle
-        fig.add_shape(
-            type="rect",
-            x0=row['retention_at_3'] - image_size/2,
-            y0=row['ctr'] - image_size/21,
-            x1=row['retention_at_3'] + image_size/2,
-            y1=row['ctr'] + image_size/21,
-            fillcolor=image_color,
-            line=dict(width=0),
-            layer="below"
-        )
+    # Tamanhos e cores de todos os anúncios
+    image_sizes = np.broadcast_to(normalize_size(df[results_column].to_numpy(dtype=float), 1, 4), len(df))
+    image_colors = get_colors(df[cost_column].to_numpy(dtype=float))
 
-        fig.add_layout_image(
+    # Retângulos e imagens de todos os anúncios numa única atualização do layout
+    hooks = df['retention_at_3'].to_numpy(dtype=float)
+    ctrs = df['ctr'].to_numpy(dtype=float)
+    half_widths = image_sizes / 2
+    half_heights = image_sizes / 21
+    fig.update_layout(
+        shapes=[
+            dict(
+                type="rect",
+                x0=x0,
+                y0=y0,
+                x1=x1,
+                y1=y1,
+                fillcolor=image_color,
+                line=dict(width=0),
+                layer="below"
+            )
+            for x0, y0, x1, y1, image_color in zip(hooks - half_widths, ctrs - half_heights, hooks + half_widths, ctrs + half_heights, image_colors)
+        ],
+        images=[
             dict(
-                source=row['creative.thumbnail_url'],
+                source=thumbnail_url,
                 xref="x",
                 yref="y",
-                x=row['retention_at_3'],
-                y=row['ctr'],
+                x=hook,
+                y=ctr,
                 sizex=image_size,
                 sizey=image_size,  # Adjust this value to change image size
                 xanchor="center",
@@ -92,7 +100,9 @@ def build_matrix(df, cost_column, results_column):
                 layer="below",
                 opacity=.8
             )
-        )
+            for hook, ctr, thumbnail_url, image_size in zip(hooks, ctrs, df['creative.thumbnail_url'], image_sizes)
+        ]
+    )
 
     # Good CTR
     fig.add_shape(
@@ -223,7 +233,7 @@ if df_ads_data is not None:
         df_ads_data = options['df_ads_data'].copy()
 
         # CRIA AGRUPAMENTO POR NOME DO ANÚNCIO (ad_name)
-        df_grouped = aggregate_dataframe(df_ads_data, group_by='ad_name')
+        df_grouped = get_session_aggregated_data(df_ads_data, group_by='ad_name')
         if group_by_ad:
             df_ads_data = df_grouped
 
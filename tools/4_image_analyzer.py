@@ -1,6 +1,8 @@
+import hashlib
 import os
 import streamlit as st
-from libs.gcloudvision import detect_safe_search
+from libs.gcloudvision import detect_safe_search_batch
+from libs.session_manager import get_or_init
 
 # Set the path to your JSON key file
 root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -14,10 +16,14 @@ st.write('Check your static ADs before publishing.')
 st.divider()
 
 
-@st.cache_data(show_spinner=False)
-def get_cached_safe_search(image_content):
-    results = detect_safe_search(image_content)
-    return results
+def get_cached_safe_search_batch(images_content):
+    # Resultado por imagem (hash do conteúdo) fica na sessão: a cada rerun só imagens novas vão para a API
+    safe_search_cache = get_or_init('safe_search_cache', {})
+    keys = [hashlib.sha256(image_content).hexdigest() for image_content in images_content]
+    missing = {key: image_content for key, image_content in zip(keys, images_content) if key not in safe_search_cache}
+    if missing:
+        safe_search_cache.update(zip(missing.keys(), detect_safe_search_batch(list(missing.values()))))
+    return [safe_search_cache[key] for key in keys]
 
 def likelihood_to_value(likelihood):
     likelihood_map = {
@@ -49,23 +55,11 @@ def create_likelihood_bar(value):
         fill_color = '#e74c3c'
 
     # CRIA BARRAS
-    final_html = ''
-    for i in range(segments):
-        if i < value:
-            final_html += f'<div class="result-block" style="background: {fill_color}"></div>'
-        else:
-            final_html += '<div class="result-block"></div>'
+    final_html = ''.join(
+        f'<div class="result-block" style="background: {fill_color}"></div>' if i < value else '<div class="result-block"></div>'
+        for i in range(segments)
+    )
 
-    # ESTILIZA BARRA PADRÃO
-    st.html("""
-        <style>
-            .result-block{
-                flex: 1;
-                background: #292929;
-                border-radius: 2px;
-            }
-        </style>""")
-    
     # CRIA BARRA FINAL
     st.html(f"""
         <div style='width: 100%; height: 1.6rem; display:flex; flex-direction: row; gap: 0.25rem'>
@@ -81,8 +75,22 @@ with file_expander:
 # SE EXISTIREM ARQUIVOS CARREGADOS
 if uploaded_files:
 
+    # ESTILIZA BARRA PADRÃO
+    st.html("""
+        <style>
+            .result-block{
+                flex: 1;
+                background: #292929;
+                border-radius: 2px;
+            }
+        </style>""")
+
+    # ANALISA TODAS AS IMAGENS COM CLOUD VISION (requisições em lote)
+    with st.spinner('Analyzing...'):
+        all_results = get_cached_safe_search_batch([uploaded_file.getvalue() for uploaded_file in uploaded_files])
+
     # PARA CADA IMAGEM
-    for uploaded_file in uploaded_files:
+    for uploaded_file, results in zip(uploaded_files, all_results):
 
         with st.container(border=True):
 
@@ -95,11 +103,6 @@ if uploaded_files:
             # RESULTADOS
             with col2:
                 st.subheader(uploaded_file.name)
-                image_content = uploaded_file.getvalue()
-
-                # INICIA ANÁLISE COM CLOUD VISION
-                with st.spinner('Analyzing...'):
-                    results = detect_safe_search(image_content)
 
                 # APRESENTA RESULTADO FINAL
                 if 'VERY_LIKELY' in results.values() or 'LIKELY' in results.values():
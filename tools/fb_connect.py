@@ -1,6 +1,7 @@
 import streamlit as st
 import streamlit.components.v1 as components
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urlencode
 from libs.graph_api import GraphAPI
 from libs.session_manager import get_session_access_token
@@ -43,9 +44,8 @@ def get_access_token(auth_code):
     return response.json()
 
 # GET AD ACCOUNTS
-@st.cache_data
-def cached_get_adaccounts(api_key):
-    """Cache the ad accounts retrieval."""
+def get_adaccounts(api_key):
+    """Ad accounts retrieval."""
     graph_api = GraphAPI(api_key)
     response = graph_api.get_adaccounts()
     if response['status'] == 'success':
@@ -54,9 +54,8 @@ def cached_get_adaccounts(api_key):
     else:
         return {'status': response['status'], 'message': response['message']}
 
-@st.cache_data
-def cached_get_account_info(api_key):
-    """Cache the ad accounts retrieval."""
+def get_account_info(api_key):
+    """Account info retrieval."""
     graph_api = GraphAPI(api_key)
     response = graph_api.get_account_info()
     if response['status'] == 'success':
@@ -65,6 +64,31 @@ def cached_get_account_info(api_key):
     else:
         return {'status': response['status'], 'message': response['message']}
 
+class ConnectionInfoError(Exception):
+    """Resposta com erro: levantada dentro da função em cache para que não fique guardada."""
+    def __init__(self, account_info, adaccounts):
+        super().__init__(account_info, adaccounts)
+        self.account_info = account_info
+        self.adaccounts = adaccounts
+
+@st.cache_data(show_spinner=False, ttl=1800, max_entries=64)
+def cached_get_connection_info(api_key):
+    """Cache the account info and ad accounts retrieval (independent requests, fetched in parallel)."""
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        account_info = executor.submit(get_account_info, api_key)
+        adaccounts = executor.submit(get_adaccounts, api_key)
+        account_info, adaccounts = account_info.result(), adaccounts.result()
+    if account_info['status'] != 'success' or adaccounts['status'] != 'success':
+        raise ConnectionInfoError(account_info, adaccounts)
+    return account_info, adaccounts
+
+def get_connection_info(api_key):
+    """Account info and ad accounts (only successful responses are cached)."""
+    try:
+        return cached_get_connection_info(api_key)
+    except ConnectionInfoError as err:
+        return err.account_info, err.adaccounts
+
 # MAIN CODE
 # 1. POPUP DE AUTENTICAÇÃO
 if 'callback' in st.query_params:
@@ -101,13 +125,12 @@ elif 'code' in st.query_params:
         st.success('Login bem-sucedido!')
         st.session_state['access_token'] = access_token
 
-        #⬇️ USUÁRIO (dados do perfil do facebook)
-        account_info = cached_get_account_info(access_token)
+        #⬇️ USUÁRIO (dados do perfil do facebook) + CONTAS DE ANÚNCIO disponíveis
+        account_info, adaccounts = get_connection_info(access_token)
         if account_info['status'] == 'success':
             st.session_state['account_info'] = account_info['data']
 
             #⬇️ CONTAS DE ANÚNCIO disponíveis
-            adaccounts = cached_get_adaccounts(access_token)
             if adaccounts['status'] == 'success':
                 st.session_state['adaccounts'] = adaccounts['data']
                 st.rerun()